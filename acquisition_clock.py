@@ -0,0 +1,145 @@
+import logging
+
+
+class AcquisitionClock:
+    """Шкала времени по счетчику измерений устройства.
+
+    Время прихода строки на компьютер зависит от загрузки цикла событий Qt. Зато счетчик
+    устройства растет равномерно, поэтому время измерения оценивается прямой
+    host_time ≈ a + b * tick, подобранной онлайн методом наименьших квадратов с забыванием.
+    Строки, пришедшие заметно позже прямой (задержка интерфейса), в подгонке не участвуют.
+    Так же не участвуют строки, прочитанные пачкой после зависания: их время прихода почти одинаково.
+    """
+
+    def __init__(self, forgetting: float = 0.999, stall_threshold: float = 0.5, max_rejected: int = 30,
+                 max_interpolated: int = 10, counter_modulus: int = 2 ** 32, recenter_ticks: int = 1000) -> None:
+        self.forgetting = forgetting  # Вес старых точек умножается на это значение с каждым измерением
+        self.stall_threshold = stall_threshold  # Опоздание (с), после которого точка считается задержанной
+        # Столько отброшенных точек подряд, пришедших в течение столько же периодов, — часы сбились, начинаем заново
+        self.max_rejected = max_rejected
+        self.max_interpolated = max_interpolated  # Пропуски длиннее этого только отмечаются, без интерполяции
+        self.counter_modulus = counter_modulus  # Период переполнения счетчика устройства
+        self.recenter_ticks = recenter_ticks  # Через столько измерений точка отсчета переносится к текущему
+        self.reset()
+
+    def reset(self) -> None:
+        self.origin_tick = None  # Точка отсчета сумм; держится рядом с последними измерениями (_recenter)
+        self.origin_time = 0.0
+        self.last_counter = None
+        self.last_tick = 0
+        self.last_time = None
+        self.rejected = 0
+        self.first_rejected_time = None  # Время прихода первой из отброшенных подряд строк
+        self.last_host_time = None
+        self.period = None  # Период измерений (наклон подгонки), переживает сброс сумм
+        self.s0 = self.sx = self.sy = self.sxx = self.sxy = 0.0
+
+    def _fit(self) -> tuple[float, float] | None:
+        """Коэффициенты (a, b) прямой в координатах относительно точки отсчета."""
+        det = self.s0 * self.sxx - self.sx ** 2
+        if self.s0 < 2 or det <= 1e-9:
+            return None
+        slope = (self.s0 * self.sxy - self.sx * self.sy) / det
+        return (self.sy - slope * self.sx) / self.s0, slope
+
+    def _update(self, x: float, y: float) -> None:
+        lam = self.forgetting
+        self.s0 = lam * self.s0 + 1
+        self.sx = lam * self.sx + x
+        self.sy = lam * self.sy + y
+        self.sxx = lam * self.sxx + x * x
+        self.sxy = lam * self.sxy + x * y
+
+    def _recenter(self, tick: int) -> None:
+        """Переносит точку отсчета в `tick`, пересчитывая суммы для сдвинутых координат.
+
+        Иначе x и y растут со временем работы, а s0 * sxx - sx ** 2 теряет точность из-за вычитания
+        больших близких чисел.
+        """
+        d = tick - self.origin_tick
+        fit = self._fit()
+        e = fit[0] + fit[1] * d if fit is not None else self.last_time - self.origin_time
+        s0, sx, sy = self.s0, self.sx, self.sy
+        self.sx = sx - d * s0
+        self.sy = sy - e * s0
+        self.sxx = self.sxx - 2 * d * sx + d * d * s0
+        self.sxy = self.sxy - d * sy - e * sx + d * e * s0
+        self.origin_tick = tick
+        self.origin_time += e
+
+    def time_of(self, tick: int) -> float:
+        """Оценка времени (unix) для развернутого значения счетчика."""
+        fit = self._fit()
+        if fit is None:
+            return self.last_time
+        x = tick - self.origin_tick
+        return self.origin_time + fit[0] + fit[1] * x
+
+    def _start(self, counter: int, host_time: float) -> tuple[float, int, list[float]]:
+        """Начинает новую шкалу (первое измерение или перезапуск устройства)."""
+        previous = self.last_time
+        self.reset()
+        self.origin_tick = self.last_tick = 0
+        self.origin_time = host_time if previous is None else max(host_time, previous + 1e-3)
+        self.last_counter, self.last_time = counter, self.origin_time
+        self.last_host_time = host_time
+        self._update(0.0, 0.0)
+        return self.origin_time, 0, []
+
+    def stamp(self, counter: int, host_time: float) -> tuple[float, int, list[float]]:
+        """Принимает счетчик и время прихода строки.
+
+        Возвращает (время измерения, число пропущенных измерений, времена пропущенных измерений
+        для интерполяции — пустой список, если пропуск длиннее max_interpolated).
+        """
+        if self.last_counter is None:
+            return self._start(counter, host_time)
+        step = (counter - self.last_counter) % self.counter_modulus
+        if step == 0 or step > self.counter_modulus // 2:
+            # Счетчик пошел назад — устройство перезапущено, старая шкала неприменима
+            logging.warning(f"Счетчик устройства сброшен ({self.last_counter} -> {counter}), шкала времени заново")
+            return self._start(counter, host_time)
+
+        tick = self.last_tick + step
+        if tick - self.origin_tick > self.recenter_ticks:
+            self._recenter(self.last_tick)
+        x, y = tick - self.origin_tick, host_time - self.origin_time
+        fit = self._fit()
+        if fit is not None:
+            self.period = fit[1]
+        late = fit is not None and self.s0 >= 10 and y - (fit[0] + fit[1] * x) > self.stall_threshold
+        # Строки, прочитанные пачкой после зависания интерфейса, приходят почти одновременно
+        burst = self.period is not None and host_time - self.last_host_time < 0.5 * step * self.period
+        self.last_host_time = host_time
+        if late or burst:
+            self.rejected += 1  # Строка задержана интерфейсом — в подгонку не берем
+            if self.first_rejected_time is None:
+                self.first_rejected_time = host_time
+            # Пачка после зависания длинной серией не считается: расхождение должно длиться реальное время
+            drifted = host_time - self.first_rejected_time > self.max_rejected * self.period
+            if late and not burst and self.rejected > self.max_rejected and drifted:
+                logging.warning("Время прихода данных устойчиво расходится с часами устройства, подгонка сброшена")
+                self.s0 = self.sx = self.sy = self.sxx = self.sxy = 0.0
+                self.rejected, self.first_rejected_time = 0, None
+                self._update(x, y)
+        else:
+            self.rejected, self.first_rejected_time = 0, None
+            self._update(x, y)
+
+        missed = step - 1
+        interpolate = range(1, step) if missed <= self.max_interpolated else range(0)
+        if self._fit() is None:
+            # Подгонка еще не готова: пропущенные измерения равномерно между соседними строками
+            timestamp = max(host_time, self.last_time + 1e-3)
+            gap_times = [self.last_time + (timestamp - self.last_time) * k / step for k in interpolate]
+        else:
+            timestamp = self.time_of(tick)
+            gap_times = [self.time_of(self.last_tick + k) for k in interpolate]
+
+        # Время строго растет, даже если подгонка только что поменяла наклон
+        floor = self.last_time
+        gap_times = [max(t, floor + 1e-3 * (k + 1)) for k, t in enumerate(gap_times)]
+        timestamp = max(timestamp, (gap_times[-1] if gap_times else floor) + 1e-3)
+
+        self.last_counter, self.last_tick, self.last_time = counter, tick, timestamp
+        return timestamp, missed, gap_times
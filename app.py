@@ -8,8 +8,11 @@ from PyQt5.QtSerialPort import QSerialPort
 from database_manager import DatabaseManager
 from ports import baudrate
 from plot_manager import PlotHandler
-from limited_table_model import LimitedTableModel
+from paged_table_model import PagedTableModel
 from ports import PortMonitor
+from archive_manager import ArchiveManager, CompactionThread
+from stream_server import SampleStreamServer
+from acquisition_clock import AcquisitionClock
 import os
 from PyQt5.QtMultimedia import QSound
 
@@ -35,6 +38,24 @@ class HEXARApp(QtWidgets.QMainWindow):
         self.connection_check_timer.start(1000)  # Проверка связи каждую секунду
         self.last_data_received_time = datetime.now()
 
+        # Часы устройства: используются, если в строках есть счетчик измерений
+        self.acquisition_clock = AcquisitionClock()
+        self.last_sample = None  # (время, реактор, пар) последнего измерения для интерполяции пропусков
+
+        # Фоновое сжатие истории: агрегаты, архив старых запусков, VACUUM
+        self.archive_manager = ArchiveManager(self.db_manager.db_name)
+        self.compaction_thread = None
+        self.compaction_timer = QTimer()
+        self.compaction_timer.timeout.connect(self.start_compaction)
+        self.compaction_timer.start(10 * 60 * 1000)  # Каждые 10 минут
+
+        # Раздача измерений внешним программам (MES, ноутбуки) по локальному сокету
+        self.stream_server = SampleStreamServer()
+        self.stream_server.start()
+
+        # Показывается self.ui, а не само окно, поэтому остановку делаем по выходу из приложения
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.shutdown)
+
         self.ui.tableView.setEditTriggers(QtWidgets.QAbstractItemView.DoubleClicked)
         self.setup_baudrates()
         self.update_ports()
@@ -77,33 +98,78 @@ class HEXARApp(QtWidgets.QMainWindow):
             self.ui.connect_indicator.setStyleSheet("QRadioButton::indicator { background-color : red }")
             self.ui.statusbar.showMessage(f"Порт {current_port} отключён!")
 
+    def start_compaction(self) -> None:
+        """Запускает проход обслуживания базы, если предыдущий уже завершился."""
+        if self.compaction_thread is not None and self.compaction_thread.isRunning():
+            return
+        exclude = (self.table_name,) if self.is_logging and hasattr(self, "table_name") else ()
+        self.compaction_thread = CompactionThread(self.archive_manager, exclude)
+        self.compaction_thread.start()
+
+    def shutdown(self) -> None:
+        """Останавливает фоновые потоки до выхода, иначе Qt аварийно завершится на работающем QThread."""
+        self.compaction_timer.stop()
+        if self.compaction_thread is not None and self.compaction_thread.isRunning():
+            logging.info("Ожидание завершения обслуживания базы...")
+            self.archive_manager.cancel()
+            self.compaction_thread.wait()
+        self.stream_server.stop()
+
     def show_select_table_dialog(self)->None:
         dialog = TableDialog("HEXAR_data.db",self)
         dialog.exec_()
     def reading(self) -> None:
-        if self.serial.canReadLine():
+        # Читаем все накопившиеся строки, чтобы задержка интерфейса не копилась в очереди порта
+        while self.serial.canReadLine():
             self.last_data_received_time = datetime.now()  # обновляем время получения данных
             try:
                 line = str(self.serial.readLine(), "utf-8").strip()
                 values = line.split(";")
                 if len(values) == 2:
-                    timestamp = datetime.now()
-                    temp1 = float(values[0])
-                    temp2 = float(values[1])
-
-                    if self.is_logging and hasattr(self, "table_name"):
-                        self.auto_insert_data(self.table_name, timestamp.strftime("%H:%M:%S"), temp1, temp2)
-
-                    self.plot_handler.update_plot(timestamp, temp1, temp2)
-
-                    self.ui.reactor_temp.setText(f"{temp1}°C")
-                    self.ui.vapor_temp.setText(f"{temp2}°C")
-                    self.check_temperature_alerts(temp1, temp2)
+                    self.process_sample(datetime.now(), float(values[0]), float(values[1]))
+                elif len(values) == 3:
+                    # Устройство передает счетчик измерений: "счетчик;реактор;пар"
+                    self.process_counted_sample(int(values[0]), float(values[1]), float(values[2]))
 
             except Exception as e:
                 logging.error(f"Ошибка в reading: {e}")
                 self.ui.statusbar.showMessage(f"Ошибка обработки данных: {e}")
 
+    def process_counted_sample(self, counter: int, temp1: float, temp2: float) -> None:
+        """Время измерения берется с часов устройства, пропущенные измерения интерполируются."""
+        stamp, missed, gap_times = self.acquisition_clock.stamp(counter, datetime.now().timestamp())
+        if gap_times and self.last_sample is not None:
+            prev_time, prev1, prev2 = self.last_sample
+            for gap_time in gap_times:
+                frac = (gap_time - prev_time) / (stamp - prev_time)
+                self.process_sample(datetime.fromtimestamp(gap_time), prev1 + (temp1 - prev1) * frac,
+                                    prev2 + (temp2 - prev2) * frac, precise=True, interpolated=True)
+        if missed:
+            logging.warning(f"Пропущено измерений: {missed}")
+        self.process_sample(datetime.fromtimestamp(stamp), temp1, temp2, precise=True,
+                            missed=missed if not gap_times else 0)
+        self.last_sample = (stamp, temp1, temp2)
+
+    def process_sample(self, timestamp: datetime, temp1: float, temp2: float, precise: bool = False,
+                       interpolated: bool = False, missed: int = 0) -> None:
+        """Записывает, рисует и публикует одно измерение. precise — сохранять время с миллисекундами.
+
+        Интерполированные строки и строки после неинтерполированного пропуска отмечаются
+        в служебной таблице, комментарий оператора остается пустым.
+        """
+        if self.is_logging and hasattr(self, "table_name"):
+            time_text = timestamp.strftime("%H:%M:%S.%f")[:-3] if precise else timestamp.strftime("%H:%M:%S")
+            self.auto_insert_data(self.table_name, time_text, temp1, temp2)
+            if interpolated or missed:
+                self.db_manager.mark_gap(self.table_name, time_text, interpolated, missed)
+
+        self.stream_server.publish(timestamp.timestamp(), temp1, temp2)
+        self.plot_handler.update_plot(timestamp, temp1, temp2)
+
+        self.ui.reactor_temp.setText(f"{temp1}°C")
+        self.ui.vapor_temp.setText(f"{temp2}°C")
+        self.check_temperature_alerts(temp1, temp2)
+
     def check_temperature_alerts(self, temp_reactor: float, temp_vapor: float) -> None:
         reactor_alert = temp_reactor > 250
         vapor_alert = temp_vapor > 30
@@ -150,6 +216,8 @@ class HEXARApp(QtWidgets.QMainWindow):
             self.serial.setPortName(self.ui.SetPort.currentText())
             if self.serial.open(QIODevice.ReadWrite):
                 self.last_data_received_time = datetime.now()
+                self.acquisition_clock.reset()
+                self.last_sample = None
                 self.ui.connect_indicator.setStyleSheet("QRadioButton::indicator { background-color : lightgreen }")
                 self.ui.statusbar.showMessage("Успешное подключение")
             else:
@@ -169,7 +237,9 @@ class HEXARApp(QtWidgets.QMainWindow):
             self.db_manager.create_table(self.table_name)
 
             db_path = self.db_manager.db_name
-            self.model = LimitedTableModel(db_path, self.table_name, limit=200)
+            if hasattr(self, "model"):
+                self.model.close()
+            self.model = PagedTableModel(db_path, self.table_name)
             self.ui.tableView.setModel(self.model)
             self.ui.tableView.verticalHeader().setVisible(False)
 
@@ -0,0 +1,137 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime, timedelta
+import pandas as pd
+from PyQt5.QtCore import QThread
+
+from run_storage import (DEFAULT_ARCHIVE_DIR, GAPS_TABLE, ROLLUP_RESOLUTIONS, ROLLUPS_TABLE, RUNS_TABLE, build_rollup,
+                         ensure_schema, list_runs, load_raw, prepare_run_frame, table_exists)
+
+
+class ArchiveManager:
+    """Сжатие истории: агрегаты 1/10 мин, перенос старых сырых данных в архив и инкрементальный VACUUM."""
+
+    def __init__(self, db_path: str, archive_dir: str = DEFAULT_ARCHIVE_DIR,
+                 max_age: timedelta = timedelta(days=30), vacuum_pages: int = 1000) -> None:
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.max_age = max_age  # Сырые данные старше этого возраста уходят в архив
+        self.vacuum_pages = vacuum_pages  # Сколько страниц освобождать за один проход
+        self.cancelled = False  # Выставляется при выходе из приложения: проход прерывается после текущего запуска
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def run_once(self, exclude: tuple[str, ...] = ()) -> None:
+        """Один проход обслуживания. Таблицы из `exclude` (например, текущая запись) не трогаются."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            ensure_schema(conn)
+            conn.commit()
+            for run in list_runs(conn):
+                if self.cancelled:
+                    return
+                if run in exclude:
+                    continue
+                try:
+                    self._register(conn, run)
+                    self._compact(conn, run)
+                    self._archive_if_old(conn, run)
+                except Exception as e:
+                    conn.rollback()
+                    logging.error(f"Ошибка обслуживания запуска {run}: {e}")
+            self._incremental_vacuum(conn)
+        finally:
+            conn.close()
+
+    def _register(self, conn: sqlite3.Connection, run: str) -> None:
+        """Запуски, созданные до появления реестра, регистрируются с текущей датой."""
+        conn.execute(f"INSERT OR IGNORE INTO {RUNS_TABLE} (name, created) VALUES (?, ?)",
+                     (run, datetime.now().isoformat(timespec='seconds')))
+        conn.commit()
+
+    def _compact(self, conn: sqlite3.Connection, run: str) -> None:
+        """Пересчитывает агрегаты, если с прошлого прохода в таблице изменилось число строк."""
+        if not table_exists(conn, run):
+            return  # Запуск уже в архиве, агрегаты построены до переноса
+        rows = conn.execute(f"SELECT COUNT(*) FROM '{run}'").fetchone()[0]
+        compacted = conn.execute(f"SELECT compacted_rows FROM {RUNS_TABLE} WHERE name = ?", (run,)).fetchone()[0]
+        if rows == compacted:
+            return
+
+        df = prepare_run_frame(load_raw(conn, run))
+        conn.execute(f"DELETE FROM {ROLLUPS_TABLE} WHERE run = ?", (run,))
+        for resolution in ROLLUP_RESOLUTIONS:
+            rollup = build_rollup(df, resolution)
+            conn.executemany(
+                f"INSERT INTO {ROLLUPS_TABLE} (run, resolution, t, n, reactor_min, reactor_max, reactor_mean, "
+                f"vapor_min, vapor_max, vapor_mean) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run, resolution, *row) for row in rollup.itertuples(index=False, name=None)],
+            )
+        conn.execute(f"UPDATE {RUNS_TABLE} SET compacted_rows = ? WHERE name = ?", (rows, run))
+        conn.commit()
+        logging.info(f"Агрегаты для {run} обновлены ({rows} строк).")
+
+    def _archive_if_old(self, conn: sqlite3.Connection, run: str) -> None:
+        """Переносит сырые данные старого запуска в сжатый CSV и удаляет таблицу из базы."""
+        if not table_exists(conn, run):
+            return
+        created = conn.execute(f"SELECT created FROM {RUNS_TABLE} WHERE name = ?", (run,)).fetchone()[0]
+        if datetime.now() - datetime.fromisoformat(created) < self.max_age:
+            return
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"{run}.csv.gz")
+        tmp_path = path + ".tmp"
+        df = pd.read_sql_query(f"SELECT time, reactor, vapor, comment FROM '{run}' ORDER BY rowid", conn)
+        df.to_csv(tmp_path, index=False, compression='gzip')
+        os.replace(tmp_path, path)  # Файл появляется целиком, только после успешной записи
+
+        conn.execute(f"UPDATE {RUNS_TABLE} SET archived_at = ?, archive_path = ? WHERE name = ?",
+                     (datetime.now().isoformat(timespec='seconds'), path, run))
+        conn.execute(f"DROP TABLE '{run}'")
+        conn.commit()
+        logging.info(f"Сырые данные {run} перенесены в архив {path}.")
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection) -> None:
+        """Освобождает часть страниц. Полный VACUUM здесь не выполняется: он блокирует запись измерений,
+        режим INCREMENTAL включает DatabaseManager при запуске."""
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                return
+            conn.execute(f"PRAGMA incremental_vacuum({self.vacuum_pages})").fetchall()
+        except sqlite3.OperationalError as e:
+            # База занята другим соединением — попробуем в следующий проход
+            logging.warning(f"VACUUM пропущен: {e}")
+
+    def forget(self, runs: list[str]) -> None:
+        """Удаляет агрегаты, отметки пропусков, записи реестра и архивные файлы удаленных запусков."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            ensure_schema(conn)
+            for run in runs:
+                row = conn.execute(f"SELECT archive_path FROM {RUNS_TABLE} WHERE name = ?", (run,)).fetchone()
+                if row and row[0] and os.path.exists(row[0]):
+                    os.remove(row[0])
+                conn.execute(f"DELETE FROM {ROLLUPS_TABLE} WHERE run = ?", (run,))
+                conn.execute(f"DELETE FROM {GAPS_TABLE} WHERE run = ?", (run,))
+                conn.execute(f"DELETE FROM {RUNS_TABLE} WHERE name = ?", (run,))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+class CompactionThread(QThread):
+    """Фоновый проход ArchiveManager, чтобы не блокировать интерфейс."""
+
+    def __init__(self, manager: ArchiveManager, exclude: tuple[str, ...] = (), parent=None) -> None:
+        super().__init__(parent)
+        self.manager = manager
+        self.exclude = exclude
+
+    def run(self) -> None:
+        try:
+            self.manager.run_once(self.exclude)
+        except Exception as e:
+            logging.error(f"Ошибка фонового сжатия базы: {e}")
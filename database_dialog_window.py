@@ -1,4 +1,6 @@
-from PyQt5.QtWidgets import QDialog, QListWidgetItem, QMessageBox, QVBoxLayout, QWidget
+from PyQt5.QtWidgets import (QAbstractItemView, QComboBox, QDialog, QHBoxLayout, QLineEdit, QListWidgetItem,
+                             QMessageBox, QPushButton, QTableView, QVBoxLayout, QWidget)
+from PyQt5.QtCore import QTimer
 from PyQt5 import uic
 import sqlite3
 import pyqtgraph as pg
@@ -6,6 +8,16 @@ import pandas as pd
 from pyqtgraph import AxisItem
 from pyqtgraph import ScatterPlotItem
 
+from archive_manager import ArchiveManager
+from history_analytics import load_runs_parallel
+from paged_table_model import PagedTableModel
+from run_comparison import ALIGN_COMMENT, ALIGN_START, ALIGN_TEMPERATURE, RunComparison
+from run_storage import (ROLLUP_RESOLUTIONS, RUNS_TABLE, filter_outliers, list_runs, load_raw, load_rollup,
+                         prepare_run_frame, raw_row_count, table_exists)
+
+LOD_MAX_POINTS = 4000  # Если в видимом диапазоне больше точек — рисуем агрегаты вместо сырых данных
+OVERVIEW_LEVEL = -1  # Прореженные сырые данные для запусков без агрегатов
+
 
 class TimeAxis(AxisItem):
     def tickStrings(self, values, scale, spacing):
@@ -18,6 +30,11 @@ class TableDialog(QDialog):
         self.ui = uic.loadUi("select_table_dialog.ui", self)
 
         self.db_path = db_path
+        self._runs = {}  # Состояние отображаемых запусков: данные по уровням детализации и кривые
+        self._lod_timer = QTimer(self)
+        self._lod_timer.setSingleShot(True)
+        self._lod_timer.timeout.connect(self._update_detail_level)
+        self.comparison = RunComparison(db_path)  # Кэширует пересчитанные сетки между нажатиями
         self._load_table_names()
         self._setup_plots()
 
@@ -30,12 +47,50 @@ class TableDialog(QDialog):
         self.all_widget = self._add_plot_to_tab('all_data')
         self.reactor_widget = self._add_plot_to_tab('reactor_data')
         self.vapor_widget = self._add_plot_to_tab('vapor_data')
+        for widget in self._plot_widgets():
+            widget.sigXRangeChanged.connect(lambda *args: self._lod_timer.start(200))
+        self._setup_comparison_tab()
+        self._setup_table_tab()
+
+    def _setup_comparison_tab(self) -> None:
+        """Вкладка сравнения: выбор канала и события выравнивания над графиком."""
+        container = self.ui.findChild(QWidget, 'compare_data')
+
+        self.compare_channel = QComboBox()
+        self.compare_channel.addItem("Реактор", 'reactor')
+        self.compare_channel.addItem("Пар", 'vapor')
+        self.compare_align = QComboBox()
+        self.compare_align.addItem("От начала", ALIGN_START)
+        self.compare_align.addItem("По температуре", ALIGN_TEMPERATURE)
+        self.compare_align.addItem("По комментарию", ALIGN_COMMENT)
+        self.compare_value = QLineEdit()
+        self.compare_value.setPlaceholderText("°C или текст комментария")
+        compare_btn = QPushButton("Сравнить")
+        compare_btn.clicked.connect(self._compare_selected_tables)
+
+        controls = QHBoxLayout()
+        for control in (self.compare_channel, self.compare_align, self.compare_value, compare_btn):
+            controls.addWidget(control)
+
+        self.compare_widget = pg.PlotWidget(axisItems={'bottom': TimeAxis(orientation='bottom')})
+        self.compare_widget.setBackground('w')
+        self.compare_widget.addLegend()
+        self.compare_widget.showGrid(x=True, y=True)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(controls)
+        layout.addWidget(self.compare_widget)
+        container.setLayout(layout)
+
+    def _plot_widgets(self) -> tuple[pg.PlotWidget, ...]:
+        return self.all_widget, self.reactor_widget, self.vapor_widget
 
 
-    def _plot_comment_points(self, widget: pg.PlotWidget, df: pd.DataFrame):
+    def _plot_comment_points(self, widget: pg.PlotWidget, df: pd.DataFrame) -> ScatterPlotItem | None:
         comments = df[df['comment'].notnull() & (df['comment'] != '')]
         if comments.empty:
-            return
+            return None
 
         spots = []
         for i, row in comments.iterrows():
@@ -49,6 +104,7 @@ class TableDialog(QDialog):
 
         scatter = ScatterPlotItem(spots=spots)
         widget.addItem(scatter)
+        return scatter
 
     # def _lock_view_to_data(self, widget: pg.PlotWidget, df: pd.DataFrame):
     #     x_min = df['delta_time'].min()
@@ -64,6 +120,88 @@ class TableDialog(QDialog):
     #     # Устанавливаем видимую область графика
     #     vb.setRange(xRange=(x_min, x_max), yRange=(y_min, y_max), padding=0.9)
 
+    def _setup_table_tab(self) -> None:
+        """Вкладка с полной таблицей запуска: фильтр на стороне SQLite и переход ко времени."""
+        container = self.ui.findChild(QWidget, 'table_data')
+        self.table_model = None
+
+        open_btn = QPushButton("Открыть")
+        open_btn.clicked.connect(self._open_table_view)
+        self.table_comment_filter = QLineEdit()
+        self.table_comment_filter.setPlaceholderText("Комментарий")
+        self.table_min_temp = QLineEdit()
+        self.table_min_temp.setPlaceholderText("Реактор от, °C")
+        self.table_max_temp = QLineEdit()
+        self.table_max_temp.setPlaceholderText("до, °C")
+        filter_btn = QPushButton("Фильтр")
+        filter_btn.clicked.connect(self._apply_table_filter)
+        self.table_jump_time = QLineEdit()
+        self.table_jump_time.setPlaceholderText("ЧЧ:ММ[:СС]")
+        self.table_jump_time.returnPressed.connect(self._jump_to_time)
+
+        controls = QHBoxLayout()
+        for control in (open_btn, self.table_comment_filter, self.table_min_temp, self.table_max_temp, filter_btn,
+                        self.table_jump_time):
+            controls.addWidget(control)
+
+        self.table_view = QTableView()
+        self.table_view.setEditTriggers(QAbstractItemView.DoubleClicked)
+        self.table_view.verticalHeader().setVisible(False)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addLayout(controls)
+        layout.addWidget(self.table_view)
+        container.setLayout(layout)
+
+    def _open_table_view(self) -> None:
+        """Открывает в таблице первый отмеченный запуск."""
+        selected_tables = self._get_checked_tables()
+        if not selected_tables:
+            return
+        table = selected_tables[0]
+        with sqlite3.connect(self.db_path) as conn:
+            if not table_exists(conn, table):
+                QMessageBox.information(self, "Таблица", f"Сырые данные {table} перенесены в архив.")
+                return
+        if self.table_model is not None:
+            self.table_model.close()
+        self.table_model = PagedTableModel(self.db_path, table)
+        self.table_view.setModel(self.table_model)
+
+    def done(self, result: int) -> None:
+        """Закрывает соединение модели таблицы вместе с диалогом."""
+        if self.table_model is not None:
+            self.table_model.close()
+            self.table_model = None
+        super().done(result)
+
+    def _apply_table_filter(self) -> None:
+        if self.table_model is None:
+            return
+        try:
+            min_temp = float(self.table_min_temp.text().replace(',', '.')) if self.table_min_temp.text() else None
+            max_temp = float(self.table_max_temp.text().replace(',', '.')) if self.table_max_temp.text() else None
+        except ValueError:
+            QMessageBox.warning(self, "Фильтр", "Температура должна быть числом.")
+            return
+        self.table_model.set_filter(self.table_comment_filter.text().strip(), min_temp, max_temp)
+
+    def _jump_to_time(self) -> None:
+        if self.table_model is None:
+            return
+        text = self.table_jump_time.text().strip()
+        if self.table_model.normalize_time(text) is None:
+            QMessageBox.warning(self, "Переход", "Введите время в формате ЧЧ:ММ или ЧЧ:ММ:СС.")
+            return
+        row = self.table_model.row_for_time(text)
+        if row is None:
+            QMessageBox.information(self, "Переход", f"Строк с временем {text} или позже не найдено.")
+            return
+        index = self.table_model.index(row, 0)
+        self.table_view.scrollTo(index, QAbstractItemView.PositionAtTop)
+        self.table_view.setCurrentIndex(index)
+
     def _add_plot_to_tab(self, tab_name: str) -> pg.PlotWidget:
         container = self.ui.findChild(QWidget, tab_name)
 
@@ -81,25 +219,17 @@ class TableDialog(QDialog):
 
     def _filter_outliers(self, series: pd.Series, window: int = 5, min_val: float = 19,
                          max_val: float = 200) -> pd.Series:
-        filtered = series.copy()
-        rolling_avg = series.rolling(window=window, center=True, min_periods=1).mean()
-
-        outliers = (series < min_val) | (series > max_val)
-        filtered[outliers] = rolling_avg[outliers]
-
-        return filtered
+        return filter_outliers(series, window, min_val, max_val)
 
     def _load_table_names(self):
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';")
-            tables = sorted(cursor.fetchall())
+            tables = list_runs(conn)  # Включая архивированные запуски, без служебных таблиц
             conn.close()
 
             self.ui.tables.clear()
             for table in tables:
-                item = QListWidgetItem(table[0])
+                item = QListWidgetItem(table)
                 item.setCheckState(0)
                 self.ui.tables.addItem(item)
 
@@ -116,9 +246,8 @@ class TableDialog(QDialog):
 
     def _load_table_data(self, table_name: str) -> pd.DataFrame:
         try:
-            query = f"SELECT time, reactor, vapor, comment FROM '{table_name}'"
             with sqlite3.connect(self.db_path) as conn:
-                df = pd.read_sql_query(query, conn)
+                df = load_raw(conn, table_name)  # Из базы или из архивного файла
 
             # Преобразование времени с защитой (пункт 7)
             df['time'] = pd.to_datetime(df['time'], format="%H:%M:%S", errors='coerce')
@@ -131,61 +260,231 @@ class TableDialog(QDialog):
 
     def _plot_selected_tables(self):
         selected_tables = self._get_checked_tables()
+        for widget in self._plot_widgets():
+            widget.clear()
+        self._runs = {}
         if not selected_tables:
-            self.all_widget.clear()
-            self.reactor_widget.clear()
-            self.vapor_widget.clear()
             print("Не выбраны таблицы.")
             return
 
-        self.all_widget.clear()
-        self.reactor_widget.clear()
-        self.vapor_widget.clear()
-
         colors = ['blue', 'green', 'red', 'orange', 'purple', 'brown', 'cyan', 'magenta']
 
+        opened = {}
         with sqlite3.connect(self.db_path) as conn:
-            for idx, table in enumerate(selected_tables):
+            for table in selected_tables:
                 try:
-                    df = pd.read_sql_query(
-                        f"SELECT time, reactor, vapor, comment FROM '{table}'", conn
-                    )
-                    df['time'] = pd.to_datetime(df['time'], format="%H:%M:%S", errors='coerce')
-                    df.dropna(subset=['time'], inplace=True)
-
-                    if df.empty:
-                        continue
-
-                    # Расчёт дельта-времени от первой точки (в минутах)
-                    start_time = df['time'].iloc[0]
-                    df['delta_time'] = (df['time'] - start_time).dt.total_seconds() / 60
-
-                    color = colors[idx % len(colors)]
-                    self._plot_data(df, table, color)
-
+                    opened[table] = self._open_run(conn, table)
                 except Exception as e:
                     print(f"Ошибка при обработке таблицы {table}: {e}")
 
-    def _plot_data(self, df: pd.DataFrame, table: str, color: str):
-        x = df['delta_time']  # Минуты с начала
-        if self.ui.filter_checkbox.isChecked():
-            reactor = self._filter_outliers(df['reactor'])
-            vapor = self._filter_outliers(df['vapor'])
+        # Запуски без актуальных агрегатов читаются и прореживаются параллельно в пуле процессов
+        without_rollups = [table for table, run in opened.items() if not run['rollups']]
+        loaded = load_runs_parallel(self.db_path, without_rollups, LOD_MAX_POINTS,
+                                    self.ui.filter_checkbox.isChecked())
+        for table in without_rollups:
+            result = loaded.get(table)
+            if result is None:
+                del opened[table]
+                continue
+            run = opened[table]
+            run['rows'], run['duration'] = result['rows'], result['duration']
+            run['levels'][OVERVIEW_LEVEL if result['decimated'] else 0] = result['data']
+            run['comments'] = result['comments']
+
+        for idx, table in enumerate(selected_tables):
+            if table in opened:
+                color = colors[idx % len(colors)]
+                self._plot_data(opened[table], table, color)
+
+        # Сначала показываем запуски целиком, дальше уровень меняется вместе с масштабом
+        full_span = max((run['duration'] for run in self._runs.values()), default=0)
+        self._update_detail_level(full_span)
+
+    def _open_run(self, conn: sqlite3.Connection, table: str) -> dict:
+        """Готовит запуск к отображению: читает актуальные агрегаты, сырые данные догружаются отдельно."""
+        rows = raw_row_count(conn, table)
+        run = {'rows': rows, 'levels': {}, 'rollups': set(), 'curves': {}, 'shown': {}, 'scatter': None,
+               'comments': None}
+
+        compacted = conn.execute(f"SELECT compacted_rows FROM {RUNS_TABLE} WHERE name = ?",
+                                 (table,)).fetchone() if table_exists(conn, RUNS_TABLE) else None
+        if compacted and compacted[0] == rows:  # Агрегаты актуальны, иначе работаем только с сырыми данными
+            for resolution in ROLLUP_RESOLUTIONS:
+                rollup = load_rollup(conn, table, resolution)
+                if not rollup.empty:
+                    run['levels'][resolution] = rollup
+                    run['rollups'].add(resolution)
+
+        if run['rollups']:
+            finest = min(run['rollups'])
+            run['duration'] = run['levels'][finest]['t'].iloc[-1] + finest
+        return run
+
+    def _choose_level(self, run: dict, span_s: float) -> int:
+        """Самый подробный уровень (0 — сырые данные), при котором в диапазон попадает не больше LOD_MAX_POINTS."""
+        if run['rows'] * span_s / max(run['duration'], 1) <= LOD_MAX_POINTS:
+            return 0
+        if not run['rollups']:
+            return OVERVIEW_LEVEL if OVERVIEW_LEVEL in run['levels'] else 0
+        for resolution in sorted(run['rollups']):
+            if span_s / resolution <= LOD_MAX_POINTS:
+                return resolution
+        return max(run['rollups'])
+
+    def _level_series(self, table: str, run: dict, level: int) -> tuple[pd.Series, pd.Series, pd.Series, dict]:
+        """Возвращает (минуты, реактор, пар, огибающие) для уровня детализации.
+
+        Огибающие — {канал: (min, max)} по агрегатам, для сырых данных пустой словарь.
+        Сырые данные догружаются при первом приближении.
+        """
+        if level not in run['levels']:
+            with sqlite3.connect(self.db_path) as conn:
+                run['levels'][level] = prepare_run_frame(load_raw(conn, table))
+        df = run['levels'][level]
+        if level == OVERVIEW_LEVEL:
+            return df['elapsed'] / 60, df['reactor'], df['vapor'], {}  # Уже отфильтровано в процессе пула
+        envelopes = {}
+        if level == 0:
+            x, reactor, vapor = df['elapsed'] / 60, df['reactor'], df['vapor']
         else:
-            reactor = df['reactor']
-            vapor = df['vapor']
-
-        self.all_widget.plot(x, reactor, pen=pg.mkPen(color, width=2), name=f'{table} R')
-        self.all_widget.plot(x, vapor, pen=pg.mkPen(color, style=pg.QtCore.Qt.DashLine, width=2), name=f'{table} V')
-        self.reactor_widget.plot(x, reactor, pen=pg.mkPen(color,width=2), name=table)
-        self.vapor_widget.plot(x, vapor, pen=pg.mkPen(color,width=2), name=table)
-
-        self._plot_comment_points(self.all_widget, df)
+            x, reactor, vapor = (df['t'] + level / 2) / 60, df['reactor_mean'], df['vapor_mean']
+            envelopes = {channel: (df[f'{channel}_min'], df[f'{channel}_max']) for channel in ('reactor', 'vapor')}
+        if self.ui.filter_checkbox.isChecked():
+            reactor = self._filter_outliers(reactor)
+            vapor = self._filter_outliers(vapor)
+            envelopes = {channel: (self._filter_outliers(low), self._filter_outliers(high))
+                         for channel, (low, high) in envelopes.items()}
+        return x, reactor, vapor, envelopes
+
+    def _update_detail_level(self, span_s: float | None = None) -> None:
+        """Переключает кривые между сырыми данными и агрегатами по ширине видимого диапазона."""
+        for widget in self._plot_widgets():
+            if span_s is None:
+                (x_min, x_max), _ = widget.getViewBox().viewRange()
+                widget_span = (x_max - x_min) * 60
+            else:
+                widget_span = span_s
+            for table, run in self._runs.items():
+                level = self._choose_level(run, widget_span)
+                if run['shown'].get(widget) == level:
+                    continue
+                try:
+                    x, reactor, vapor, envelopes = self._level_series(table, run, level)
+                except Exception as e:
+                    print(f"Ошибка при загрузке данных {table}: {e}")
+                    continue
+                curves = run['curves'][widget]
+                if widget is self.all_widget:
+                    curves[0].setData(x, reactor)
+                    curves[1].setData(x, vapor)
+                    self._show_comment_points(table, run, level)
+                elif widget is self.reactor_widget:
+                    curves[0].setData(x, reactor)
+                else:
+                    curves[0].setData(x, vapor)
+                self._set_envelopes(run, widget, x, envelopes)
+                run['shown'][widget] = level
+
+    def _set_envelopes(self, run: dict, widget: pg.PlotWidget, x: pd.Series, envelopes: dict) -> None:
+        """Показывает полосу min/max агрегатов, чтобы короткие выбросы не пропадали при усреднении."""
+        for channel, (lower, upper, fill) in run['envelopes'][widget].items():
+            if channel in envelopes:
+                low, high = envelopes[channel]
+                lower.setData(x, low)
+                upper.setData(x, high)
+                fill.setVisible(True)
+            else:
+                fill.setVisible(False)
+                lower.setData([], [])
+                upper.setData([], [])
+
+    def _show_comment_points(self, table: str, run: dict, level: int) -> None:
+        """Комментарии отображаются вместе с сырыми данными и с их прореженной обзорной версией."""
+        visible = level in (0, OVERVIEW_LEVEL)
+        if visible and run['scatter'] is None:
+            # Для запусков из пула процессов комментарии пришли отдельно, для остальных — в сырых данных
+            df = (run['comments'] if run['comments'] is not None else run['levels'][0]).copy()
+            df['delta_time'] = df['elapsed'] / 60
+            run['scatter'] = self._plot_comment_points(self.all_widget, df)
+        if run['scatter'] is not None:
+            run['scatter'].setVisible(visible)
+
+    def _plot_data(self, run: dict, table: str, color: str):
+        # Кривые создаются пустыми, данные подставляет _update_detail_level по текущему масштабу
+        run['curves'] = {
+            self.all_widget: [
+                self.all_widget.plot(pen=pg.mkPen(color, width=2), name=f'{table} R'),
+                self.all_widget.plot(pen=pg.mkPen(color, style=pg.QtCore.Qt.DashLine, width=2), name=f'{table} V'),
+            ],
+            self.reactor_widget: [self.reactor_widget.plot(pen=pg.mkPen(color, width=2), name=table)],
+            self.vapor_widget: [self.vapor_widget.plot(pen=pg.mkPen(color, width=2), name=table)],
+        }
+        channels = {self.all_widget: ('reactor', 'vapor'), self.reactor_widget: ('reactor',),
+                    self.vapor_widget: ('vapor',)}
+        run['envelopes'] = {widget: {channel: self._add_envelope(widget, color) for channel in widget_channels}
+                            for widget, widget_channels in channels.items()}
+        self._runs[table] = run
 
         # self._lock_view_to_data(self.all_widget, df)
         # self._lock_view_to_data(self.reactor_widget, df)
         # self._lock_view_to_data(self.vapor_widget, df)
 
+    @staticmethod
+    def _add_envelope(widget: pg.PlotWidget, color: str) -> tuple:
+        """Пустая полоса min/max цвета запуска: (нижняя кривая, верхняя кривая, заливка)."""
+        lower = widget.plot(pen=None)
+        upper = widget.plot(pen=None)
+        brush = pg.mkColor(color)
+        brush.setAlpha(50)
+        fill = pg.FillBetweenItem(lower, upper, brush=pg.mkBrush(brush))
+        fill.setVisible(False)
+        widget.addItem(fill)
+        return lower, upper, fill
+
+    def _compare_selected_tables(self) -> None:
+        """Накладывает выбранные запуски, выровненные по событию, со средним и полосой ±σ."""
+        self.compare_widget.clear()
+        selected_tables = self._get_checked_tables()
+        if not selected_tables:
+            return
+
+        channel = self.compare_channel.currentData()
+        align = self.compare_align.currentData()
+        value = self.compare_value.text().strip()
+        if align == ALIGN_TEMPERATURE:
+            try:
+                value = float(value.replace(',', '.'))
+            except ValueError:
+                QMessageBox.warning(self, "Сравнение", "Введите температуру события.")
+                return
+        elif align == ALIGN_COMMENT and not value:
+            QMessageBox.warning(self, "Сравнение", "Введите текст комментария.")
+            return
+
+        try:
+            result = self.comparison.compare(selected_tables, channel, align, value,
+                                             self.ui.filter_checkbox.isChecked())
+        except Exception as e:
+            QMessageBox.critical(self, "Ошибка", f"Ошибка при сравнении запусков:\n{e}")
+            return
+        if result['skipped']:
+            print(f"Событие не найдено в таблицах: {', '.join(result['skipped'])}")
+        if not result['runs']:
+            return
+
+        x = result['time']
+        colors = ['blue', 'green', 'red', 'orange', 'purple', 'brown', 'cyan', 'magenta']
+        for idx, (table, values) in enumerate(zip(result['runs'], result['values'])):
+            self.compare_widget.plot(x, values, pen=pg.mkPen(colors[idx % len(colors)], width=1), connect='finite',
+                                     name=f"{table} (σ={result['deviation'][table]:.1f})")
+
+        upper = self.compare_widget.plot(x, result['mean'] + result['std'], pen=None, connect='finite')
+        lower = self.compare_widget.plot(x, result['mean'] - result['std'], pen=None, connect='finite')
+        self.compare_widget.addItem(pg.FillBetweenItem(upper, lower, brush=pg.mkBrush(0, 0, 0, 40)))
+        self.compare_widget.plot(x, result['min'], pen=pg.mkPen('gray', style=pg.QtCore.Qt.DotLine), connect='finite')
+        self.compare_widget.plot(x, result['max'], pen=pg.mkPen('gray', style=pg.QtCore.Qt.DotLine), connect='finite')
+        self.compare_widget.plot(x, result['mean'], pen=pg.mkPen('k', width=3), connect='finite', name="Среднее")
+
     def _delete_tables(self):
         selected_tables = self._get_checked_tables()
         if not selected_tables:
@@ -201,6 +500,7 @@ class TableDialog(QDialog):
                     cursor.execute(f"DROP TABLE IF EXISTS '{table}'")
                 conn.commit()
                 conn.close()
+                ArchiveManager(self.db_path).forget(selected_tables)  # Агрегаты и архивные файлы
                 self._load_table_names()
             except Exception as e:
                 QMessageBox.critical(self, "Ошибка", f"Ошибка при удалении таблиц:\n{e}")
@@ -1,6 +1,8 @@
 from PyQt5.QtSql import QSqlDatabase, QSqlTableModel, QSqlQuery
 from PyQt5.QtWidgets import QMessageBox
 import logging
+from datetime import datetime
+from run_storage import GAPS_SCHEMA, GAPS_TABLE, RUN_TABLE_SCHEMA, RUNS_SCHEMA, RUNS_TABLE
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -16,24 +18,44 @@ class DatabaseManager:
             QMessageBox.critical(None, "Ошибка", error_message)
             raise Exception(error_message)
         logging.info("Подключение к базе данных успешно установлено.")
+        self.enable_incremental_vacuum()
+
+    def enable_incremental_vacuum(self):
+        """Переводит базу в режим auto_vacuum=INCREMENTAL.
+
+        Для существующей базы это требует полного VACUUM, поэтому он выполняется здесь, при запуске,
+        пока запись не идет. Фоновое обслуживание потом освобождает страницы только инкрементально.
+        """
+        query = QSqlQuery()
+        if query.exec("PRAGMA auto_vacuum") and query.next() and query.value(0) == 2:
+            return
+        query.exec("PRAGMA auto_vacuum = INCREMENTAL")
+        if query.exec("VACUUM"):
+            logging.info("База переведена в режим инкрементального VACUUM.")
+        else:
+            logging.warning(f"Не удалось перевести базу в режим инкрементального VACUUM: {query.lastError().text()}")
 
     def create_table(self, table_name):
         """Создает таблицу с указанным именем, если она не существует."""
         query = QSqlQuery()
-        if not query.exec(f"""
-            CREATE TABLE IF NOT EXISTS {table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                time TEXT NOT NULL,
-                reactor REAL NOT NULL,
-                vapor REAL NOT NULL,
-                comment TEXT
-            )
-        """):
+        if not query.exec(RUN_TABLE_SCHEMA.format(table_name=table_name)):
             error_message = f"Не удалось создать таблицу {table_name}: {query.lastError().text()}"
             logging.error(error_message)
             QMessageBox.critical(None, "Ошибка", error_message)
         else:
             logging.info(f"Таблица {table_name} успешно создана или уже существует.")
+            self.register_run(table_name)
+
+    def register_run(self, table_name):
+        """Записывает запуск в реестр (дата создания нужна для переноса в архив)."""
+        query = QSqlQuery()
+        query.exec(RUNS_SCHEMA)
+        query.exec(GAPS_SCHEMA)
+        query.prepare(f"INSERT OR IGNORE INTO {RUNS_TABLE} (name, created) VALUES (:name, :created)")
+        query.bindValue(":name", table_name)
+        query.bindValue(":created", datetime.now().isoformat(timespec='seconds'))
+        if not query.exec():
+            logging.error(f"Не удалось зарегистрировать запуск {table_name}: {query.lastError().text()}")
 
     def get_model(self, table_name):
         """Возвращает модель для работы с указанной таблицей."""
@@ -62,6 +84,18 @@ class DatabaseManager:
         else:
             logging.info(f"Данные успешно вставлены в таблицу {table_name}.")
 
+    def mark_gap(self, table_name, time, interpolated=False, missed=0):
+        """Отмечает измерение как интерполированное или стоящее после пропуска (отдельно от комментария)."""
+        query = QSqlQuery()
+        query.prepare(f"INSERT INTO {GAPS_TABLE} (run, time, interpolated, missed) "
+                      f"VALUES (:run, :time, :interpolated, :missed)")
+        query.bindValue(":run", table_name)
+        query.bindValue(":time", time)
+        query.bindValue(":interpolated", int(interpolated))
+        query.bindValue(":missed", missed)
+        if not query.exec():
+            logging.error(f"Не удалось отметить пропуск в таблице {table_name}: {query.lastError().text()}")
+
     def close(self):
         """Закрывает соединение с базой данных."""
         self.db.close()
@@ -1,71 +1,135 @@
+import argparse
+import os
 import sqlite3
+import sys
 from datetime import datetime, timedelta
-import random
-
-
-def generate_data(start_time, num_points, base_temp):
-    data = []
-    current_time = datetime.strptime(start_time, "%H:%M:%S")
-    for i in range(num_points):
-        # Генерация данных с небольшими случайными колебаниями
-        reactor_temp = base_temp + random.uniform(-2.5, 2.5)
-        vapor_temp = reactor_temp * 0.5 + random.uniform(-1.0, 1.0)
-
-        # Добавление аномалий в 5% случаев
-        if random.random() < 0.05:
-            reactor_temp += random.uniform(5.0, 15.0)
-            comment = "Аномальное значение"
-        elif random.random() < 0.1:
-            reactor_temp -= random.uniform(5.0, 10.0)
-            comment = "Понижение температуры"
-        else:
-            comment = "Нормальный режим"
-
-        data.append((
-            current_time.strftime("%H:%M:%S"),
-            round(reactor_temp, 2),
-            round(vapor_temp, 2),
-            comment
-        ))
-        current_time += timedelta(seconds=15)
-    return data
-
-
-# Создаем базу данных
-conn = sqlite3.connect('TEST_data.db')
-cursor = conn.cursor()
-
-# Создаем таблицы
-cursor.execute('''
-CREATE TABLE H1 (
-    time TEXT PRIMARY KEY,
-    reactor REAL NOT NULL,
-    vapor REAL NOT NULL,
-    comment TEXT
-)
-''')
-
-cursor.execute('''
-CREATE TABLE H2 (
-    time TEXT PRIMARY KEY,
-    reactor REAL NOT NULL,
-    vapor REAL NOT NULL,
-    comment TEXT
-)
-''')
-
-# Генерируем данные для H1 (дневная смена, более высокая температура)
-h1_data = generate_data("08:00:00", 800, 245.0)
-
-# Генерируем данные для H2 (ночная смена, немного ниже температура)
-h2_data = generate_data("09:00:00", 800, 235.0)
-
-# Вставляем данные
-cursor.executemany('INSERT INTO H1 VALUES (?, ?, ?, ?)', h1_data)
-cursor.executemany('INSERT INTO H2 VALUES (?, ?, ?, ?)', h2_data)
-
-# Сохраняем изменения и закрываем соединение
-conn.commit()
-conn.close()
-
-print("База данных reactor_data.db успешно создана с 800 записями в каждой таблице.")
\ No newline at end of file
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from run_storage import RUN_TABLE_SCHEMA, RUNS_SCHEMA, RUNS_TABLE  # noqa: E402
+
+BLOCK_ROWS = 100_000  # Размер блока генерации; от него зависит поток случайных чисел, поэтому он фиксирован
+COMMENTS = np.array(["Загрузка", "Начало нагрева", "Добавлен реагент", "Отбор пробы", "Регулировка нагрева",
+                     "Аномальное значение", "Начало охлаждения"])
+# Подписи времени для каждой секунды суток: время строки — просто индекс в этом массиве
+TIME_LABELS = np.array([f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)])
+
+
+def run_parameters(rng: np.random.Generator, rows: int, period: int) -> dict:
+    """Случайные параметры профиля одного запуска."""
+    duration = rows * period
+    return {
+        'start': int(rng.integers(0, 86400)),  # Начало в любое время суток, длинные запуски переходят через полночь
+        'setpoint': rng.uniform(180.0, 245.0),  # Температура выдержки реактора
+        'ramp': duration * rng.uniform(0.1, 0.25),  # Длительность нагрева
+        'cooldown': duration * rng.uniform(0.05, 0.15),  # Длительность охлаждения в конце
+        'wobble': rng.uniform(1.0, 4.0),  # Амплитуда медленных колебаний регулятора
+        'wobble_period': rng.uniform(600.0, 3600.0),
+        'vapor_ratio': rng.uniform(0.08, 0.12),  # Доля перегрева реактора, доходящая до паров
+        'vapor_lag': rng.uniform(60.0, 600.0),  # Запаздывание паров относительно реактора, с
+    }
+
+
+def reactor_profile(t: np.ndarray, p: dict, duration: float) -> np.ndarray:
+    """Нагрев от комнатной температуры, выдержка с колебаниями регулятора и охлаждение."""
+    ambient = 20.0
+    heat = np.clip(t / p['ramp'], 0.0, 1.0)
+    cool = np.clip((duration - t) / p['cooldown'], 0.0, 1.0)
+    level = ambient + (p['setpoint'] - ambient) * np.minimum(1 - (1 - heat) ** 2, cool)
+    return level + p['wobble'] * np.sin(2 * np.pi * t / p['wobble_period']) * heat * cool
+
+
+def generate_block(rng: np.random.Generator, first_row: int, rows: int, period: int, total_rows: int,
+                   p: dict, anomaly_rate: float, comment_rate: float) -> tuple[np.ndarray, ...]:
+    """Генерирует блок строк запуска: время, реактор, пар и комментарии."""
+    index = np.arange(first_row, first_row + rows)
+    t = index * float(period)
+    duration = total_rows * float(period)
+
+    reactor = reactor_profile(t, p, duration) + rng.normal(0.0, 0.4, rows)
+    vapor_base = reactor_profile(np.maximum(t - p['vapor_lag'], 0.0), p, duration)
+    vapor = 20.0 + (vapor_base - 20.0) * p['vapor_ratio'] + rng.normal(0.0, 0.2, rows)
+
+    # Аномалии: всплески и типичные ошибки датчика (0 и -127 °C)
+    anomalies = np.flatnonzero(rng.random(rows) < anomaly_rate)
+    kinds = rng.integers(0, 3, anomalies.size)
+    reactor[anomalies[kinds == 0]] += rng.uniform(15.0, 60.0, np.count_nonzero(kinds == 0))
+    reactor[anomalies[kinds == 1]] = 0.0
+    reactor[anomalies[kinds == 2]] = -127.0
+
+    comments = np.full(rows, "", dtype=object)
+    commented = rng.random(rows) < comment_rate
+    comments[commented] = COMMENTS[rng.integers(0, COMMENTS.size, np.count_nonzero(commented))]
+
+    times = TIME_LABELS[(p['start'] + index * period) % 86400]
+    return times, np.round(reactor, 2), np.round(vapor, 2), comments
+
+
+def write_run(conn: sqlite3.Connection, table: str, rows: int, period: int, seed: int, run_index: int,
+              anomaly_rate: float, comment_rate: float, created: datetime) -> None:
+    """Создает таблицу запуска и заполняет ее блоками через executemany, фиксируя каждый блок.
+
+    Коммит после блока не дает WAL-файлу вырасти до размера всего запуска.
+    """
+    p = run_parameters(np.random.default_rng([seed, run_index]), rows, period)
+    conn.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.execute(RUN_TABLE_SCHEMA.format(table_name=table))
+    insert = f"INSERT INTO {table} (time, reactor, vapor, comment) VALUES (?, ?, ?, ?)"
+    for block, first_row in enumerate(range(0, rows, BLOCK_ROWS)):
+        rng = np.random.default_rng([seed, run_index, block])
+        columns = generate_block(rng, first_row, min(BLOCK_ROWS, rows - first_row), period, rows, p,
+                                 anomaly_rate, comment_rate)
+        conn.executemany(insert, zip(*(column.tolist() for column in columns)))
+        conn.commit()
+    conn.execute(f"INSERT OR REPLACE INTO {RUNS_TABLE} (name, created) VALUES (?, ?)",
+                 (table, created.isoformat(timespec='seconds')))
+    conn.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Генератор синтетической базы HEXAR для бенчмарков")
+    parser.add_argument("--db", default="TEST_data.db", help="файл базы данных")
+    parser.add_argument("--runs", type=int, default=2, help="количество запусков (таблиц)")
+    parser.add_argument("--rows", type=int, default=800, help="строк в запуске (минимум, если задан --rows-max)")
+    parser.add_argument("--rows-max", type=int, default=None,
+                        help="максимум строк; размер запуска выбирается лог-равномерно между --rows и --rows-max")
+    parser.add_argument("--period", type=int, default=15, help="период измерений, с")
+    parser.add_argument("--anomaly-rate", type=float, default=0.01, help="доля аномальных измерений")
+    parser.add_argument("--comment-rate", type=float, default=0.002, help="доля строк с комментарием")
+    parser.add_argument("--max-age-days", type=float, default=0.0,
+                        help="даты создания запусков распределяются на столько дней назад (для проверки архива)")
+    parser.add_argument("--prefix", default="RUN", help="префикс имен таблиц")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора; одинаковое зерно — одинаковые данные")
+    args = parser.parse_args()
+    if args.rows <= 0:
+        parser.error("--rows должно быть больше нуля")
+    if args.rows_max is not None and args.rows_max < args.rows:
+        parser.error("--rows-max должно быть не меньше --rows")
+    if args.runs <= 0 or args.period <= 0:
+        parser.error("--runs и --period должны быть больше нуля")
+
+    rng = np.random.default_rng(args.seed)
+    if args.rows_max:
+        sizes = np.exp(rng.uniform(np.log(args.rows), np.log(args.rows_max), args.runs)).astype(np.int64)
+    else:
+        sizes = np.full(args.runs, args.rows, dtype=np.int64)
+    ages = rng.uniform(0.0, args.max_age_days, args.runs)
+
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = OFF")  # База одноразовая, надежность записи не нужна
+    conn.execute(RUNS_SCHEMA)
+    now = datetime.now()
+    width = len(str(args.runs))
+    for run_index, (rows, age) in enumerate(zip(sizes, ages)):
+        table = f"{args.prefix}_{run_index + 1:0{width}d}"
+        write_run(conn, table, int(rows), args.period, args.seed, run_index, args.anomaly_rate,
+                  args.comment_rate, now - timedelta(days=float(age)))
+        print(f"{table}: {rows} строк")
+    conn.close()
+
+    print(f"База данных {args.db} создана: {args.runs} запусков, {int(sizes.sum())} строк.")
+
+
+if __name__ == "__main__":
+    main()
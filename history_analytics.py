@@ -0,0 +1,137 @@
+import logging
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+from run_storage import filter_outliers, load_raw, prepare_run_frame
+
+_executor = None  # Пул процессов создается один раз: запуск процессов дороже самой загрузки небольших таблиц
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: fork многопоточного процесса с Qt может унести в дочерний процесс захваченные блокировки
+        _executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _reset_executor() -> None:
+    """Сбрасывает сломанный пул (рабочий процесс упал), следующий вызов создаст новый."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def decimation_indices(reactor: np.ndarray, vapor: np.ndarray, max_points: int) -> np.ndarray:
+    """Индексы точек для прореживания min/max: в каждом интервале сохраняются экстремумы обоих каналов.
+
+    На интервал приходится не больше пяти точек (начало и четыре экстремума), так что результат
+    не длиннее max_points.
+    """
+    n = reactor.size
+    edges = np.unique(np.linspace(0, n, max(max_points // 5, 1) + 1).astype(np.int64))
+    starts = edges[:-1]
+    bucket_of = np.repeat(np.arange(starts.size), np.diff(edges))
+    picked = [starts]
+    for channel in (reactor, vapor):
+        for reduce in (np.minimum, np.maximum):
+            # Экстремум каждого интервала без цикла Python и индекс его первого вхождения
+            extreme = reduce.reduceat(channel, starts)
+            hits = np.flatnonzero(channel == extreme[bucket_of])
+            picked.append(hits[np.unique(bucket_of[hits], return_index=True)[1]])
+    return np.unique(np.concatenate(picked))
+
+
+def _analyze_run(db_path: str, run: str, shm_name: str, max_points: int, filtered: bool) -> dict | None:
+    """Работает в процессе пула: загрузка, фильтрация и прореживание одного запуска.
+
+    Массивы (секунды от начала, реактор, пар) записываются в общую память, выделенную главным процессом,
+    обратно возвращаются только размеры и комментарии (секунды от начала, реактор, текст).
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        df = prepare_run_frame(load_raw(conn, run))
+    finally:
+        conn.close()
+    if df.empty:
+        return None
+
+    elapsed = df['elapsed'].to_numpy(dtype=float)
+    reactor = df['reactor'].to_numpy(dtype=float)
+    vapor = df['vapor'].to_numpy(dtype=float)
+    decimated = len(df) > max_points
+    # Комментарии берутся из полных данных: при прореживании их строки могут не попасть в выборку
+    marked = (df['comment'].notnull() & (df['comment'] != '')).to_numpy()
+    comments = list(zip(elapsed[marked].tolist(), reactor[marked].tolist(), df.loc[marked, 'comment'].tolist()))
+    if decimated:
+        # Фильтр до прореживания, иначе min/max выберут именно выбросы
+        if filtered:
+            reactor = filter_outliers(df['reactor']).to_numpy(dtype=float)
+            vapor = filter_outliers(df['vapor']).to_numpy(dtype=float)
+        keep = decimation_indices(reactor, vapor, max_points)
+        elapsed, reactor, vapor = elapsed[keep], reactor[keep], vapor[keep]
+    # Полные данные не фильтруются: фильтр применит окно истории, как и для сырых данных из базы
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((3, max_points), dtype=np.float64, buffer=shm.buf)
+        out[0, :elapsed.size], out[1, :elapsed.size], out[2, :elapsed.size] = elapsed, reactor, vapor
+        del out  # Иначе close() не освободит буфер
+    finally:
+        shm.close()
+    return {'rows': len(df), 'duration': float(df['elapsed'].iloc[-1]), 'count': int(elapsed.size),
+            'decimated': decimated, 'comments': comments}
+
+
+def load_runs_parallel(db_path: str, runs: list[str], max_points: int, filtered: bool) -> dict[str, dict]:
+    """Загружает запуски параллельно в пуле процессов.
+
+    Для каждого запуска возвращает {'rows', 'duration', 'decimated', 'data', 'comments'}, где 'data' —
+    DataFrame с колонками elapsed, reactor, vapor: полные данные, если строк не больше max_points,
+    иначе отфильтрованная (при filtered=True) и прореженная до max_points обзорная версия.
+    'comments' — все комментарии запуска (elapsed, reactor, comment) в обоих случаях.
+    """
+    blocks = {run: shared_memory.SharedMemory(create=True, size=3 * max_points * 8) for run in runs}
+    try:
+        if len(runs) > 1:
+            executor = _get_executor()
+            futures = {run: executor.submit(_analyze_run, db_path, run, blocks[run].name, max_points, filtered)
+                       for run in runs}
+        else:
+            futures = {}
+
+        results = {}
+        for run in runs:
+            try:
+                if run in futures:
+                    results[run] = futures[run].result()
+                else:
+                    results[run] = _analyze_run(db_path, run, blocks[run].name, max_points, filtered)
+            except BrokenProcessPool as e:
+                logging.error(f"Пул процессов аварийно завершился при загрузке запуска {run}: {e}")
+                _reset_executor()
+            except Exception as e:
+                logging.error(f"Ошибка при загрузке запуска {run}: {e}")
+
+        loaded = {}
+        for run, result in results.items():
+            if result is None:
+                continue
+            arrays = np.ndarray((3, max_points), dtype=np.float64, buffer=blocks[run].buf)[:, :result['count']].copy()
+            data = pd.DataFrame({'elapsed': arrays[0], 'reactor': arrays[1], 'vapor': arrays[2]})
+            comments = pd.DataFrame(result['comments'], columns=['elapsed', 'reactor', 'comment'])
+            loaded[run] = {'rows': result['rows'], 'duration': result['duration'],
+                           'decimated': result['decimated'], 'data': data, 'comments': comments}
+        return loaded
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
@@ -0,0 +1,211 @@
+from bisect import bisect_right
+from collections import OrderedDict
+import sqlite3
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# Секунды от начала суток для колонки времени 'ЧЧ:ММ:СС[.ф]' в SQL
+SECONDS_SQL = "(CAST(substr({0}, 1, 2) AS INTEGER) * 3600 + CAST(substr({0}, 4, 2) AS INTEGER) * 60 " \
+              "+ CAST(substr({0}, 7, 2) AS INTEGER))"
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Модель всей таблицы запуска со страничной подгрузкой по rowid.
+
+    В памяти лежат только границы страниц (каждый page_size-й rowid) и несколько последних
+    прочитанных страниц, поэтому прокрутка миллионов строк не требует загрузки всей таблицы.
+    Фильтр по комментарию и диапазону температуры выполняется на стороне SQLite.
+    """
+
+    def __init__(self, db_path: str, table_name: str, page_size: int = 500, max_pages: int = 20) -> None:
+        super().__init__()
+        self.db_path = db_path
+        self.table_name = table_name
+        self.page_size = page_size
+        self.max_pages = max_pages  # Сколько страниц держим в кэше
+        self.conn = sqlite3.connect(db_path)
+
+        self.where = ""  # SQL-условие текущего фильтра (начинается с " AND ...")
+        self.params: tuple = ()
+        self.total = 0
+        self.anchors: list[int] = []  # Первый rowid каждой страницы
+        self.last_rowid = 0
+        self.pages = OrderedDict()  # номер страницы -> список строк (LRU)
+        # Первые rowid каждых суток запуска (без учета фильтра), дополняются вместе с новыми строками
+        self.day_starts: list[int] = []
+        self.day_last_rowid = 0
+        self.day_last_time: str | None = None
+        self.load_data(reset=True)
+
+    def set_filter(self, comment: str = "", min_temp: float | None = None, max_temp: float | None = None,
+                   channel: str = 'reactor') -> None:
+        """Фильтрует строки по тексту комментария и диапазону температуры канала."""
+        conditions, params = [], []
+        if comment:
+            escaped = comment.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("comment LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if min_temp is not None:
+            conditions.append(f"{channel} >= ?")
+            params.append(min_temp)
+        if max_temp is not None:
+            conditions.append(f"{channel} <= ?")
+            params.append(max_temp)
+        self.where = "".join(f" AND {condition}" for condition in conditions)
+        self.params = tuple(params)
+        self.load_data(reset=True)
+
+    def load_data(self, reset: bool = False) -> None:
+        """Подхватывает новые строки в конце таблицы; при reset=True перестраивает индекс страниц."""
+        self._extend_day_starts()
+        if reset:
+            self.beginResetModel()
+            self.total, self.anchors, self.last_rowid = 0, [], 0
+            self.pages.clear()
+
+        new_rows, last_rowid = self.conn.execute(
+            f"SELECT COUNT(*), MAX(rowid) FROM '{self.table_name}' WHERE rowid > ?{self.where}",
+            (self.last_rowid, *self.params),
+        ).fetchone()
+        if new_rows:
+            # Границы новых страниц выбираем в SQLite, не перебирая все rowid в Python
+            first_anchor = -self.total % self.page_size
+            cursor = self.conn.execute(
+                f"SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER (ORDER BY rowid) - 1 AS n "
+                f"FROM '{self.table_name}' WHERE rowid > ? AND rowid <= ?{self.where}) "
+                f"WHERE n % {self.page_size} = {first_anchor} ORDER BY rowid",
+                (self.last_rowid, last_rowid, *self.params),
+            )
+            self.anchors.extend(rowid for (rowid,) in cursor)
+            self.last_rowid = last_rowid
+
+        if reset:
+            self.total += new_rows
+            self.endResetModel()
+        elif new_rows:
+            self.pages.pop(self.total // self.page_size, None)  # Последняя страница дополнилась
+            self.beginInsertRows(QModelIndex(), self.total, self.total + new_rows - 1)
+            self.total += new_rows
+            self.endInsertRows()
+
+    def _page(self, number: int) -> list[tuple]:
+        page = self.pages.get(number)
+        if page is None:
+            cursor = self.conn.execute(
+                f"SELECT rowid, time, reactor, vapor, comment FROM '{self.table_name}' "
+                f"WHERE rowid >= ?{self.where} ORDER BY rowid LIMIT {self.page_size}",
+                (self.anchors[number], *self.params),
+            )
+            page = cursor.fetchall()
+            self.pages[number] = page
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return page
+
+    def _row(self, row: int) -> tuple:
+        return self._page(row // self.page_size)[row % self.page_size]
+
+    @staticmethod
+    def normalize_time(text: str) -> str | None:
+        """Приводит 'Ч:М[:С[.ф]]' к формату хранения 'ЧЧ:ММ:СС[.ф]'; None, если это не время."""
+        parts = text.strip().split(":")
+        if len(parts) == 2:
+            parts.append("0")  # Время без секунд
+        if len(parts) != 3:
+            return None
+        seconds, _, fraction = parts[2].partition(".")
+        if not all(p.isdigit() for p in (parts[0], parts[1], seconds)) or (fraction and not fraction.isdigit()):
+            return None
+        hours, minutes, seconds = int(parts[0]), int(parts[1]), int(seconds)
+        if hours > 23 or minutes > 59 or seconds > 59:
+            return None
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}" + (f".{fraction}" if fraction else "")
+
+    def _extend_day_starts(self) -> None:
+        """Дополняет границы суток по строкам, добавленным после прошлого вызова."""
+        cursor = self.conn.execute(
+            f"SELECT rowid, time, prev FROM (SELECT rowid, time, LAG(time, 1, ?) OVER (ORDER BY rowid) AS prev "
+            f"FROM '{self.table_name}' WHERE rowid > ?) WHERE prev IS NULL "
+            f"OR {SECONDS_SQL.format('prev')} - {SECONDS_SQL.format('time')} > 43200 ORDER BY rowid",
+            (self.day_last_time, self.day_last_rowid),
+        )
+        self.day_starts.extend(rowid for rowid, _, _ in cursor)
+        last = self.conn.execute(
+            f"SELECT rowid, time FROM '{self.table_name}' WHERE rowid > ? ORDER BY rowid DESC LIMIT 1",
+            (self.day_last_rowid,),
+        ).fetchone()
+        if last is not None:
+            self.day_last_rowid, self.day_last_time = last
+
+    def row_for_time(self, time: str) -> int | None:
+        """Номер первой (в текущем фильтре) строки, где время запуска впервые доходит до `time`.
+
+        Поиск идет от первых суток, в которых это время есть (в первых сутках — не раньше начала
+        запуска). Если до конца суток строк с таким временем нет, берется первая строка следующих суток.
+        """
+        target = self.normalize_time(time)
+        if target is None or not self.anchors or not self.day_starts:
+            return None
+        first_time = self.conn.execute(f"SELECT time FROM '{self.table_name}' WHERE rowid = ?",
+                                       (self.day_starts[0],)).fetchone()[0]
+        day = 1 if first_time > target else 0  # Начало запуска позже искомого времени — ищем в следующих сутках
+        if day >= len(self.day_starts):
+            return None
+        next_day = self.day_starts[day + 1] if day + 1 < len(self.day_starts) else None
+        bound = "time >= ?" if next_day is None else f"(time >= ? OR rowid >= {int(next_day)})"
+        found = self.conn.execute(
+            f"SELECT rowid FROM '{self.table_name}' WHERE rowid >= ? AND {bound}{self.where} "
+            f"ORDER BY rowid LIMIT 1",
+            (self.day_starts[day], target, *self.params),
+        ).fetchone()
+        if found is None:
+            return None
+        page = bisect_right(self.anchors, found[0]) - 1
+        offset = self.conn.execute(
+            f"SELECT COUNT(*) FROM '{self.table_name}' WHERE rowid >= ? AND rowid < ?{self.where}",
+            (self.anchors[page], found[0], *self.params),
+        ).fetchone()[0]
+        return page * self.page_size + offset
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self.total
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 4  # Количество колонок (time, reactor, vapor, comment)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        value = self._row(index.row())[index.column() + 1]  # +1 из-за rowid
+        return "" if value is None else str(value)
+
+    def setData(self, index, value, role=Qt.EditRole) -> bool:
+        """Сохраняет изменения комментариев в базе"""
+        if index.isValid() and role == Qt.EditRole:
+            row = self._row(index.row())
+            new_value = value.strip()
+            self.conn.execute(f"UPDATE '{self.table_name}' SET comment = ? WHERE rowid = ?", (new_value, row[0]))
+            self.conn.commit()
+
+            # Обновляем кеш страницы и таблицу
+            page = self.pages[index.row() // self.page_size]
+            page[index.row() % self.page_size] = (*row[:-1], new_value)
+            self.dataChanged.emit(index, index, [Qt.DisplayRole])
+            return True
+        return False
+
+    def flags(self, index):
+        """Разрешаем редактирование только колонки 'Комментарий'"""
+        if index.column() == 3:  # 3-я колонка — комментарий
+            return Qt.ItemIsSelectable | Qt.ItemIsEnabled | Qt.ItemIsEditable
+        return Qt.ItemIsSelectable | Qt.ItemIsEnabled
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole:
+            if orientation == Qt.Horizontal:
+                return ["Время", "Реактор", "Пар", "Комментарий"][section]
+        return None
+
+    def close(self) -> None:
+        self.conn.close()
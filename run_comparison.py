@@ -0,0 +1,134 @@
+import sqlite3
+import warnings
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from run_storage import filter_outliers, load_raw, prepare_run_frame, raw_row_count, table_exists
+
+ALIGN_START = "start"  # От первой точки запуска
+ALIGN_TEMPERATURE = "temperature"  # От первого достижения заданной температуры
+ALIGN_COMMENT = "comment"  # От первого комментария, содержащего заданный текст
+
+
+class RunComparison:
+    """Выравнивание запусков по событию, пересчет на общую сетку и статистика наложения.
+
+    Кэшируются только пересчитанные сетки (не сырые данные), не больше max_cached штук:
+    повторное сравнение тех же запусков не читает базу заново, а устаревшая версия сетки
+    запуска заменяется новой.
+    """
+
+    def __init__(self, db_path: str, step_s: float = 10.0, max_gap_s: float = 120.0, max_cached: int = 128) -> None:
+        self.db_path = db_path
+        self.step_s = step_s  # Шаг общей сетки, секунды
+        self.max_gap_s = max_gap_s  # Внутри пропусков длиннее этого значения точки сетки остаются NaN
+        self.max_cached = max_cached
+        # (run, канал, выравнивание, значение, фильтр) -> (версия данных, (первая точка сетки, значения) или None)
+        self._grids = OrderedDict()
+
+    def _version(self, conn: sqlite3.Connection, run: str) -> int:
+        """Дешевый признак изменения данных: последний rowid (для архивных — число строк)."""
+        if table_exists(conn, run):
+            return conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM '{run}'").fetchone()[0]
+        return raw_row_count(conn, run)
+
+    def event_time(self, df: pd.DataFrame, channel: str, align: str, value=None) -> float | None:
+        """Время события (секунды от начала запуска) или None, если событие не найдено."""
+        if df.empty:
+            return None
+        if align == ALIGN_START:
+            return 0.0
+        if align == ALIGN_TEMPERATURE:
+            hits = np.flatnonzero(df[channel].to_numpy() >= float(value))
+        elif align == ALIGN_COMMENT:
+            comments = df['comment'].fillna('').astype(str)
+            hits = np.flatnonzero(comments.str.contains(str(value), case=False, regex=False).to_numpy())
+        else:
+            raise ValueError(f"Неизвестный способ выравнивания: {align}")
+        return float(df['elapsed'].iloc[hits[0]]) if hits.size else None
+
+    def _resample(self, df: pd.DataFrame, channel: str, event: float) -> tuple[int, np.ndarray]:
+        """Интерполирует канал на точки, кратные шагу сетки относительно события."""
+        rel = df['elapsed'].to_numpy() - event
+        values = df[channel].to_numpy(dtype=float)
+        first = int(np.ceil(rel[0] / self.step_s))
+        last = int(np.floor(rel[-1] / self.step_s))
+        grid = np.arange(first, last + 1) * self.step_s
+        resampled = np.interp(grid, rel, values)
+
+        # Не выдумываем данные внутри длинных пропусков
+        right = np.clip(np.searchsorted(rel, grid), 1, len(rel) - 1)
+        gaps = (rel[right] - rel[right - 1]) > self.max_gap_s
+        resampled[gaps & (grid != rel[right]) & (grid != rel[right - 1])] = np.nan
+        return first, resampled
+
+    def _grid(self, conn: sqlite3.Connection, run: str, channel: str, align: str, value,
+              filtered: bool) -> tuple[int, np.ndarray] | None:
+        """Сетка запуска из кэша или заново из базы, если данные запуска изменились."""
+        version = self._version(conn, run)
+        key = (run, channel, align, value, filtered)
+        cached = self._grids.get(key)
+        if cached is not None and cached[0] == version:
+            self._grids.move_to_end(key)
+            return cached[1]
+
+        df = prepare_run_frame(load_raw(conn, run))
+        if filtered and not df.empty:
+            # Ошибки датчика (0 и -127 °C) иначе попадают в среднее и разброс
+            df[channel] = filter_outliers(df[channel])
+        event = self.event_time(df, channel, align, value)
+        grid = None if event is None or len(df) < 2 else self._resample(df, channel, event)
+        self._grids[key] = (version, grid)
+        self._grids.move_to_end(key)
+        while len(self._grids) > self.max_cached:
+            self._grids.popitem(last=False)
+        return grid
+
+    def compare(self, runs: list[str], channel: str = 'reactor', align: str = ALIGN_START, value=None,
+                filtered: bool = False) -> dict:
+        """Выравнивает запуски и считает среднее, разброс, огибающую и отклонение каждого запуска от среднего.
+
+        filtered=True заменяет выбросы (как _filter_outliers в истории) до пересчета на сетку.
+        Возвращает словарь: 'time' (минуты от события), 'runs', 'values' (запуски x сетка),
+        'mean', 'std', 'min', 'max', 'deviation' (СКО запуска от среднего) и 'skipped' (без события).
+        """
+        aligned, skipped = {}, []
+        with sqlite3.connect(self.db_path) as conn:
+            for run in runs:
+                grid = self._grid(conn, run, channel, align, value, filtered)
+                if grid is None:
+                    skipped.append(run)
+                else:
+                    aligned[run] = grid
+
+        if not aligned:
+            return {'time': np.array([]), 'runs': [], 'values': np.empty((0, 0)), 'mean': np.array([]),
+                    'std': np.array([]), 'min': np.array([]), 'max': np.array([]), 'deviation': {},
+                    'skipped': skipped}
+
+        start = min(first for first, _ in aligned.values())
+        end = max(first + len(values) for first, values in aligned.values())
+        matrix = np.full((len(aligned), end - start), np.nan)
+        for row, (first, values) in enumerate(aligned.values()):
+            matrix[row, first - start:first - start + len(values)] = values
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # Столбцы без данных дают NaN — это ожидаемо
+            mean = np.nanmean(matrix, axis=0)
+            std = np.nanstd(matrix, axis=0)
+            low = np.nanmin(matrix, axis=0)
+            high = np.nanmax(matrix, axis=0)
+            deviation = np.sqrt(np.nanmean((matrix - mean) ** 2, axis=1))
+
+        return {
+            'time': np.arange(start, end) * self.step_s / 60,
+            'runs': list(aligned),
+            'values': matrix,
+            'mean': mean,
+            'std': std,
+            'min': low,
+            'max': high,
+            'deviation': dict(zip(aligned, deviation)),
+            'skipped': skipped,
+        }
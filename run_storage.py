@@ -0,0 +1,214 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Служебные таблицы (не показываются в списке запусков)
+RUNS_TABLE = "_hexar_runs"
+ROLLUPS_TABLE = "_hexar_rollups"
+GAPS_TABLE = "_hexar_gaps"
+SERVICE_TABLES = (RUNS_TABLE, ROLLUPS_TABLE, GAPS_TABLE)
+
+ROLLUP_RESOLUTIONS = (60, 600)  # Агрегаты по 1 и 10 минут (в секундах)
+DEFAULT_ARCHIVE_DIR = "archive"
+
+# Схема таблицы одного запуска (как ее создает DatabaseManager.create_table)
+RUN_TABLE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        time TEXT NOT NULL,
+        reactor REAL NOT NULL,
+        vapor REAL NOT NULL,
+        comment TEXT
+    )
+"""
+
+RUNS_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+        name TEXT PRIMARY KEY,
+        created TEXT NOT NULL,
+        compacted_rows INTEGER NOT NULL DEFAULT 0,
+        archived_at TEXT,
+        archive_path TEXT
+    )
+"""
+
+ROLLUPS_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUPS_TABLE} (
+        run TEXT NOT NULL,
+        resolution INTEGER NOT NULL,
+        t REAL NOT NULL,
+        n INTEGER NOT NULL,
+        reactor_min REAL, reactor_max REAL, reactor_mean REAL,
+        vapor_min REAL, vapor_max REAL, vapor_mean REAL,
+        PRIMARY KEY (run, resolution, t)
+    )
+"""
+
+# Служебные отметки измерений (интерполированные строки и пропуски): хранятся отдельно,
+# чтобы не смешиваться с комментариями оператора
+GAPS_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS {GAPS_TABLE} (
+        run TEXT NOT NULL,
+        time TEXT NOT NULL,
+        interpolated INTEGER NOT NULL DEFAULT 0,
+        missed INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Создает служебные таблицы реестра запусков, агрегатов и отметок пропусков."""
+    conn.execute(RUNS_SCHEMA)
+    conn.execute(ROLLUPS_SCHEMA)
+    conn.execute(GAPS_SCHEMA)
+
+
+def seconds_of_day(times: pd.Series) -> pd.Series:
+    """Переводит строки 'ЧЧ:ММ:СС[.ффф]' в секунды от начала суток (NaN для битых строк)."""
+    fast = _seconds_of_day_fixed(times)
+    if fast is not None:
+        return fast
+    parts = times.astype(str).str.split(":", n=2, expand=True)
+    if parts.shape[1] < 3:
+        return pd.Series(np.nan, index=times.index)
+    hours = pd.to_numeric(parts[0], errors='coerce')
+    minutes = pd.to_numeric(parts[1], errors='coerce')
+    seconds = pd.to_numeric(parts[2], errors='coerce')
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _seconds_of_day_fixed(times: pd.Series) -> pd.Series | None:
+    """Быстрый разбор строк фиксированной ширины как массива байтов; None, если формат другой."""
+    try:
+        raw = times.to_numpy().astype('S13')  # 13-й байт должен остаться пустым: строка не длиннее 12
+    except (UnicodeEncodeError, ValueError, TypeError):
+        return None
+    if raw.size == 0:
+        return None
+    d = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(-1, 13).astype(np.int64) - ord('0')
+    digits = d[:, [0, 1, 3, 4, 6, 7]]
+    fraction = d[:, 9:12]
+    valid = ((digits >= 0) & (digits <= 9)).all(axis=1)
+    valid &= (d[:, 2] == ord(':') - ord('0')) & (d[:, 5] == ord(':') - ord('0')) & (d[:, 12] == -ord('0'))
+    has_fraction = d[:, 8] == ord('.') - ord('0')
+    valid &= has_fraction | ((d[:, 8:] == -ord('0')).all(axis=1))
+    fraction_digit = (fraction >= 0) & (fraction <= 9)
+    valid &= (fraction_digit | (fraction == -ord('0'))).all(axis=1)
+    if not valid.all():
+        return None
+    seconds = (digits[:, 0] * 10 + digits[:, 1]) * 3600 + (digits[:, 2] * 10 + digits[:, 3]) * 60 \
+        + digits[:, 4] * 10 + digits[:, 5]
+    seconds = seconds + (np.where(fraction_digit, fraction, 0) * np.array([0.1, 0.01, 0.001])).sum(axis=1)
+    return pd.Series(seconds.astype(float), index=times.index)
+
+
+def unwrap_midnight(seconds: np.ndarray) -> np.ndarray:
+    """Превращает время суток в монотонную шкалу с учетом перехода через полночь."""
+    seconds = np.asarray(seconds, dtype=float)
+    if seconds.size < 2:
+        return seconds
+    wraps = np.diff(seconds) < -43200  # Скачок назад больше чем на 12 часов — новые сутки
+    offsets = np.concatenate(([0], np.cumsum(wraps))) * 86400.0
+    return seconds + offsets
+
+
+def prepare_run_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Отбрасывает строки с битым временем и добавляет колонку 'elapsed' (секунды от первой точки)."""
+    df = df.copy()
+    df['elapsed'] = seconds_of_day(df['time'])
+    df.dropna(subset=['elapsed'], inplace=True)
+    if df.empty:
+        return df
+    absolute = unwrap_midnight(df['elapsed'].to_numpy())
+    df['elapsed'] = absolute - absolute[0]
+    return df.reset_index(drop=True)
+
+
+def filter_outliers(series: pd.Series, window: int = 5, min_val: float = 19,
+                    max_val: float = 200) -> pd.Series:
+    """Заменяет значения вне [min_val, max_val] скользящим средним (ошибки датчика)."""
+    filtered = series.copy()
+    rolling_avg = series.rolling(window=window, center=True, min_periods=1).mean()
+
+    outliers = (series < min_val) | (series > max_val)
+    filtered[outliers] = rolling_avg[outliers]
+
+    return filtered
+
+
+def table_exists(conn: sqlite3.Connection, table_name: str) -> bool:
+    cursor = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (table_name,))
+    return cursor.fetchone() is not None
+
+
+def list_runs(conn: sqlite3.Connection) -> list[str]:
+    """Возвращает имена всех запусков: таблицы с сырыми данными и архивированные запуски."""
+    placeholders = ", ".join("?" for _ in SERVICE_TABLES)
+    cursor = conn.execute(
+        f"SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' "
+        f"AND name NOT IN ({placeholders})",
+        SERVICE_TABLES,
+    )
+    names = {row[0] for row in cursor.fetchall()}
+    if table_exists(conn, RUNS_TABLE):
+        cursor = conn.execute(f"SELECT name FROM {RUNS_TABLE} WHERE archive_path IS NOT NULL")
+        names.update(row[0] for row in cursor.fetchall())
+    return sorted(names)
+
+
+def archive_path_for(conn: sqlite3.Connection, run: str) -> str | None:
+    """Путь к архивному файлу запуска или None, если запуск не архивирован."""
+    if not table_exists(conn, RUNS_TABLE):
+        return None
+    row = conn.execute(f"SELECT archive_path FROM {RUNS_TABLE} WHERE name = ?", (run,)).fetchone()
+    return row[0] if row else None
+
+
+def load_raw(conn: sqlite3.Connection, run: str) -> pd.DataFrame:
+    """Загружает сырые данные запуска из базы или из архивного файла."""
+    if table_exists(conn, run):
+        return pd.read_sql_query(f"SELECT time, reactor, vapor, comment FROM '{run}'", conn)
+    path = archive_path_for(conn, run)
+    if path and os.path.exists(path):
+        return pd.read_csv(path, compression='gzip', dtype={'time': str, 'comment': str})
+    return pd.DataFrame(columns=['time', 'reactor', 'vapor', 'comment'])
+
+
+def raw_row_count(conn: sqlite3.Connection, run: str) -> int:
+    """Количество сырых строк запуска (для архивированных — из реестра)."""
+    if table_exists(conn, run):
+        return conn.execute(f"SELECT COUNT(*) FROM '{run}'").fetchone()[0]
+    if table_exists(conn, RUNS_TABLE):
+        row = conn.execute(f"SELECT compacted_rows FROM {RUNS_TABLE} WHERE name = ?", (run,)).fetchone()
+        if row:
+            return row[0]
+    return 0
+
+
+def load_rollup(conn: sqlite3.Connection, run: str, resolution: int) -> pd.DataFrame:
+    """Загружает агрегаты запуска с заданным разрешением (пустой DataFrame, если их нет)."""
+    if not table_exists(conn, ROLLUPS_TABLE):
+        return pd.DataFrame()
+    return pd.read_sql_query(
+        f"SELECT t, n, reactor_min, reactor_max, reactor_mean, vapor_min, vapor_max, vapor_mean "
+        f"FROM {ROLLUPS_TABLE} WHERE run = ? AND resolution = ? ORDER BY t",
+        conn, params=(run, resolution),
+    )
+
+
+def build_rollup(df: pd.DataFrame, resolution: int) -> pd.DataFrame:
+    """Строит min/max/mean агрегаты по интервалам `resolution` секунд из подготовленных данных."""
+    buckets = (df['elapsed'] // resolution) * resolution
+    grouped = df.groupby(buckets)
+    rollup = pd.DataFrame({
+        'n': grouped.size(),
+        'reactor_min': grouped['reactor'].min(),
+        'reactor_max': grouped['reactor'].max(),
+        'reactor_mean': grouped['reactor'].mean(),
+        'vapor_min': grouped['vapor'].min(),
+        'vapor_max': grouped['vapor'].max(),
+        'vapor_mean': grouped['vapor'].mean(),
+    })
+    rollup.index.name = 't'
+    return rollup.reset_index()
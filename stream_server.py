@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import threading
+from collections import deque
+
+
+class SampleStreamServer:
+    """Локальная раздача измерений по TCP (или Unix-сокету) в формате NDJSON.
+
+    Каждая строка — JSON-объект {"t": unix-время, "reactor": ..., "vapor": ...}.
+    Клиент может прислать {"last": N}, чтобы получить измерения за последние N секунд из буфера
+    (без повторов уже отправленных строк; порядок по времени гарантирован, если запрос отправлен
+    сразу после подключения).
+    Сервер работает в собственном потоке с asyncio, `publish` можно вызывать из потока Qt.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, unix_path: str | None = None,
+                 buffer_seconds: float = 3600, client_queue_size: int = 1000) -> None:
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path  # Если задан — слушаем Unix-сокет вместо TCP
+        self.buffer_seconds = buffer_seconds
+        self.client_queue_size = client_queue_size  # Клиент, отставший на столько строк, отключается
+
+        self.buffer = deque()  # (t, строка NDJSON) за последние buffer_seconds
+        self.clients: set[asyncio.Queue] = set()
+        self.writers: dict[asyncio.Queue, asyncio.StreamWriter] = {}  # Соединение каждого клиента
+        self.first_live: dict[asyncio.Queue, float] = {}  # Время первой живой строки каждого клиента
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.server = None
+        self.thread: threading.Thread | None = None
+        self.started = threading.Event()
+
+    def start(self) -> None:
+        """Запускает сервер в фоновом потоке."""
+        self.thread = threading.Thread(target=self._run, name="SampleStreamServer", daemon=True)
+        self.thread.start()
+        self.started.wait(timeout=5)
+
+    def stop(self) -> None:
+        if self.loop is not None and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+
+    def publish(self, t: float, reactor: float, vapor: float) -> None:
+        """Передает измерение подписчикам. Не блокирует: работа переносится в поток сервера."""
+        if self.loop is None or not self.loop.is_running():
+            return
+        line = (json.dumps({"t": t, "reactor": reactor, "vapor": vapor}) + "\n").encode()
+        self.loop.call_soon_threadsafe(self._broadcast, t, line)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            if self.unix_path:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_unix_server(self._handle_client, path=self.unix_path))
+                logging.info(f"Сервер измерений слушает {self.unix_path}")
+            else:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_server(self._handle_client, self.host, self.port))
+                logging.info(f"Сервер измерений слушает {self.host}:{self.port}")
+        except OSError as e:
+            logging.error(f"Не удалось запустить сервер измерений: {e}")
+            self.started.set()
+            self.loop.close()
+            self.loop = None
+            return
+
+        self.started.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            self.loop.run_until_complete(self.server.wait_closed())
+            self.loop.close()
+
+    def _broadcast(self, t: float, line: bytes) -> None:
+        self.buffer.append((t, line))
+        while self.buffer and self.buffer[0][0] < t - self.buffer_seconds:
+            self.buffer.popleft()
+
+        for queue in list(self.clients):
+            try:
+                queue.put_nowait((t, line))
+                self.first_live.setdefault(queue, t)
+            except asyncio.QueueFull:
+                # Медленный клиент не должен тормозить остальных — отключаем его
+                self._drop(queue)
+
+    def _drop(self, queue: asyncio.Queue) -> None:
+        """Отключает отставшего клиента: он больше не получает строки."""
+        logging.warning(f"Клиент потока измерений {self._peer(queue)} не успевает читать, отключаем")
+        self.clients.discard(queue)
+        self.first_live.pop(queue, None)
+        self._force_close(queue)
+
+    def _peer(self, queue: asyncio.Queue):
+        writer = self.writers.get(queue)
+        return writer.get_extra_info("peername") if writer is not None else None
+
+    def _force_close(self, queue: asyncio.Queue) -> None:
+        """Освобождает место в очереди, кладет маркер отключения и обрывает соединение.
+
+        Обрыв нужен для клиента, который перестал читать: его обработчик висит в writer.drain()
+        и сам маркер не увидит.
+        """
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        writer = self.writers.get(queue)
+        if writer is not None:
+            writer.transport.abort()
+
+    def _history(self, seconds: float, before: float | None) -> list[bytes]:
+        """Строки за последние `seconds` секунд, которые старше `before` (первой живой строки клиента)."""
+        if not self.buffer:
+            return []
+        since = self.buffer[-1][0] - seconds
+        lines = []
+        for t, line in reversed(self.buffer):
+            if t < since:
+                break
+            if before is None or t < before:
+                lines.append(line)
+        return lines[::-1]
+
+    def _replay(self, queue: asyncio.Queue, seconds: float) -> None:
+        """Ставит историю в начало очереди клиента без повторов.
+
+        В историю попадают только строки старше первой живой строки этого клиента, поэтому ничего
+        не дублируется, а если запрос пришел сразу после подключения — порядок времени сохраняется.
+        Работает в потоке цикла событий без await, поэтому новые строки не вклиниваются.
+        """
+        history = self._history(seconds, self.first_live.get(queue))
+        if not history:
+            return
+        if queue.full():
+            # История не помещается перед живыми строками — клиент и так отстал до предела
+            self._drop(queue)
+            return
+        pending = []
+        while not queue.empty():
+            pending.append(queue.get_nowait())
+        queue.put_nowait((None, b"".join(history)))  # Одним куском, чтобы не переполнять очередь
+        for item in pending:
+            queue.put_nowait(item)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        queue = asyncio.Queue(maxsize=self.client_queue_size)
+        self.clients.add(queue)
+        self.writers[queue] = writer
+        logging.info(f"Подключен клиент потока измерений {peer}")
+
+        requests = asyncio.ensure_future(self._read_requests(reader, queue))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                writer.write(item[1])
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.clients.discard(queue)
+            self.first_live.pop(queue, None)
+            self.writers.pop(queue, None)
+            requests.cancel()
+            writer.close()
+            logging.info(f"Клиент потока измерений {peer} отключен")
+
+    async def _read_requests(self, reader: asyncio.StreamReader, queue: asyncio.Queue) -> None:
+        """Обрабатывает запросы клиента вида {"last": N}."""
+        while True:
+            try:
+                raw = await reader.readline()
+            except (ValueError, ConnectionError) as e:
+                # Слишком длинная строка запроса или обрыв связи — отключаем клиента
+                logging.warning(f"Некорректный запрос клиента потока измерений: {e}")
+                self._force_close(queue)
+                return
+            if not raw:
+                self._force_close(queue)  # Клиент закрыл соединение
+                return
+            try:
+                seconds = float(json.loads(raw)["last"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            self._replay(queue, seconds)